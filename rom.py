@@ -1,18 +1,30 @@
-import io, os, re, zipfile, unicodedata, base64
+import io, os, re, sys, tempfile, zipfile, unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing as mp
 from datetime import date, datetime
+from importlib.machinery import ModuleSpec
 from urllib.parse import urlparse, quote
 
 import pandas as pd
+from pandas.api.types import is_numeric_dtype
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
+from openpyxl import load_workbook
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import Paragraph, Frame
-from reportlab.lib.styles import ParagraphStyle
+from romaneio_pdf import PDF_LOTE, RE_DIGITS, gerar_lote, gerar_pdf_leilao
+
+try:
+    import python_calamine  # noqa: F401  (engine="calamine" do pandas)
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+# O Streamlit roda este script num módulo "__main__" falso, com __file__ e sem __spec__. Assim o
+# multiprocessing (spawn/forkserver) reexecutaria o app inteiro em cada worker do pool de PDFs;
+# com um __spec__ de nome "__main__" ele não reimporta o script no filho (o worker só precisa de romaneio_pdf).
+__spec__ = ModuleSpec("__main__", None)
 
 # ==========================
 # CONFIG
@@ -21,24 +33,27 @@ APP_TITLE       = "Romaneio Manual — Tecadi (FINALIZADOS)"
 ONEDRIVE_LINK   = "https://tecadi-my.sharepoint.com/:x:/g/personal/rafael_alves_tecadi_com_br/EaJshSFavb5Pv8z_dpW3ZWwB8cAXsuPSrGyYoAB7ye11Aw"
 
 SHEET_NAME      = "PROCESSOS S.LEITURA"
-CLIENTE_FIXO    = "SPRINGER CARRIER LTDA (MIDEA)."
-CONTEUDO_FIXO   = "CHEIO"
-PRODUTO_TITULO  = "FAST CIF/FOB"
-FORM_COD        = "FM 108"
-FORM_REV        = "01"
-FORM_ISO_DATE   = "02/10/2025"  # data fixa do quadro "Romaneio" no PDF
 
-BG_IMAGE_PATH   = "fundoapp.jpg"      # fundo do APP
-LOGO_IMAGE_PATH = "logo_tecadi.png"   # logo no PDF (fundo do PDF é branco)
+BG_IMAGE_PATH   = "static/fundoapp.jpg"  # fundo do APP (servido em app/static/, ver .streamlit/config.toml)
+
+ZIP_ENTRY_DATE   = (1980, 1, 1, 0, 0, 0)  # data das entradas do ZIP (menor aceita pelo formato)
 
 REQUIRED_FOR_PDF = ["ARMADOR","TECADI","SKU","QTD","LISTA","DEMANDA","TRANSPORTADORA","NOME","PLACA"]
 
 # ==========================
 # HELPERS (planilha)
 # ==========================
+_RE_THOUSANDS_DOT = re.compile(r"\.(?=\d{3}(?:\D|$))")
+
+@st.cache_resource
+def _combining_del_table() -> dict:
+    """Tabela p/ str.translate que apaga os acentos (combining) — montada 1x por processo, não a cada rerun."""
+    return dict.fromkeys(i for i in range(sys.maxunicode + 1) if unicodedata.combining(chr(i)))
+
+_COMBINING_DEL = _combining_del_table()
+
 def normalize(s: str) -> str:
-    s = str(s)
-    s = "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+    s = unicodedata.normalize("NFKD", str(s)).translate(_COMBINING_DEL)
     s = " ".join(s.strip().split())
     return s.upper()
 
@@ -48,6 +63,7 @@ COLMAP = {
     "SKU":"SKU","QTD":"QTD","M3":"M3","STATUS":"STATUS","NOME":"NOME","MOTORISTA":"NOME",
     "PLACA":"PLACA","TECADI":"TECADI","LISTA":"LISTA"
 }
+COLMAP_NORMALIZED = {normalize(k): v for k, v in COLMAP.items()}
 
 def find_header_row(df_raw: pd.DataFrame) -> int:
     for i in range(min(20, len(df_raw))):
@@ -57,249 +73,159 @@ def find_header_row(df_raw: pd.DataFrame) -> int:
     return 0
 
 def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
-    return df.rename(columns={c: COLMAP.get(normalize(c), normalize(c)) for c in df.columns}) \
+    norm = {c: normalize(c) for c in df.columns}
+    return df.rename(columns={c: COLMAP_NORMALIZED.get(n, n) for c, n in norm.items()}) \
              .loc[:, lambda d: ~d.columns.duplicated()].copy()
 
+def _col_as_string(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype="string")
+    return df[col].astype("string").fillna("")
+
+def make_keys(df: pd.DataFrame) -> pd.Series:
+    """Chave 'nº da DEMANDA|ARMADOR' de cada linha (seleção manual e filtro do ZIP)."""
+    demanda = _col_as_string(df, "DEMANDA")
+    demanda_num = demanda.str.extract(RE_DIGITS.pattern, expand=False).fillna(demanda)
+    return demanda_num.str.cat(_col_as_string(df, "ARMADOR"), sep="|")
+
+def finalizados(df: pd.DataFrame) -> pd.DataFrame:
+    """Linhas com STATUS = FINALIZADO (STATUS já vem normalizado do load) + a _key de seleção.
+    Calculado 1x por Atualizar e guardado na sessão: resumo e geração leem daí.
+    Mantém o índice do load (linha no Excel)."""
+    df_fin = df[df["STATUS"].eq("FINALIZADO")].copy()
+    df_fin["_key"] = make_keys(df_fin)
+    return df_fin
+
+def read_sheet_openpyxl(xls_bytes: bytes, ncols: int = 15) -> pd.DataFrame:
+    """Fallback sem calamine: openpyxl em modo read_only (streaming, sem montar o DOM inteiro)."""
+    wb = load_workbook(io.BytesIO(xls_bytes), read_only=True, data_only=True)
+    try:
+        rows = [row[:ncols] for row in wb[SHEET_NAME].iter_rows(values_only=True)]
+    finally:
+        wb.close()
+    return pd.DataFrame(rows)
+
 def load_excel_from_bytes(xls_bytes: bytes) -> pd.DataFrame:
-    df_raw = pd.read_excel(io.BytesIO(xls_bytes), sheet_name=SHEET_NAME, header=None, engine="openpyxl")
-    header_row = find_header_row(df_raw)
-    headers = df_raw.iloc[header_row].astype(str).tolist()
-    df = df_raw.iloc[header_row+1:].copy()
+    if HAS_CALAMINE:
+        # leitura única: o calamine carrega a aba inteira de qualquer jeito (nrows/usecols não economizam)
+        df_raw = pd.read_excel(io.BytesIO(xls_bytes), sheet_name=SHEET_NAME, header=None, engine="calamine")
+    else:
+        df_raw = read_sheet_openpyxl(xls_bytes)  # já vem limitado a A:O
+    df_raw = df_raw.iloc[find_header_row(df_raw):, :15]  # A:O (planilha mais estreita também serve)
+    headers = df_raw.iloc[0].astype(str).tolist()
+    df = df_raw.iloc[1:].copy()
     df.columns = headers
-    df = df.iloc[:, :15]  # A:O
+    df = df.infer_objects()  # sem a linha do cabeçalho as colunas ganham o dtype real (QTD numérica -> float64)
     df = df.dropna(how="all")
     df = rename_columns(df)
 
     if "QTD" in df.columns:
-        df["QTD"] = (df["QTD"].astype(str).str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
-        df["QTD"] = pd.to_numeric(df["QTD"], errors="coerce")
+        qtd = df["QTD"]
+        if is_numeric_dtype(qtd):
+            df["QTD"] = qtd.astype("float64")
+        else:
+            # "1.234,5" -> "1234.5": tira o ponto de milhar e troca a vírgula decimal
+            qtd = qtd.astype("string").str.replace(_RE_THOUSANDS_DOT, "", regex=True).str.replace(",", ".", regex=False)
+            df["QTD"] = pd.to_numeric(qtd, errors="coerce")
 
     if "STATUS" in df.columns:
         df["STATUS"] = df["STATUS"].astype(str).str.strip().str.upper()
 
-    return df.reset_index(drop=True)
+    # colunas em Arrow (string[pyarrow], double[pyarrow]...): os .str.* seguintes rodam em C, sem PyObject por célula
+    df = df.convert_dtypes(dtype_backend="pyarrow")
+    df.index = df.index + 1  # índice = nº da linha no Excel (usado nas mensagens de erro do ZIP)
+    return df
 
 # ==========================
 # ONEDRIVE / SHAREPOINT
 # ==========================
+@st.cache_resource
+def _http_session() -> requests.Session:
+    """Sessão única p/ o processo: reaproveita as conexões TLS (keep-alive) entre HEAD, GET e redirects."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _remote_validator(url: str) -> str:
+    """ETag/Last-Modified do arquivo remoto ('' se o servidor não informar)."""
+    try:
+        r = _http_session().head(url, allow_redirects=True, timeout=15)
+    except requests.RequestException:
+        return ""
+    return r.headers.get("ETag") or r.headers.get("Last-Modified") or ""
+
+def _download(url: str) -> bytes:
+    with _http_session().get(url, allow_redirects=True, timeout=60, stream=True) as r:
+        if r.ok:
+            buf = io.BytesIO()
+            for chunk in r.iter_content(64*1024):
+                buf.write(chunk)
+            if buf.tell() > 1000:
+                return buf.getvalue()
+    raise RuntimeError(f"Resposta inválida de {url} (HTTP {r.status_code}).")
+
+@st.cache_data(ttl=300, max_entries=2, show_spinner=False)  # só a versão atual (e a anterior) da planilha
+def _fetch(url: str, validator: str) -> bytes:
+    """validator só entra na chave do cache: se a planilha mudar, baixa de novo."""
+    return _download(url)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _parse(xls_bytes: bytes) -> pd.DataFrame:
+    return load_excel_from_bytes(xls_bytes)
+
 def onedrive_direct_download(shared_url: str) -> bytes:
     u = urlparse(shared_url); base = f"{u.scheme}://{u.netloc}"
     url1 = f"{base}/_layouts/15/download.aspx?SourceUrl={quote(shared_url, safe='')}"
-    r1 = requests.get(url1, allow_redirects=True, timeout=60)
-    if r1.ok and r1.content and len(r1.content) > 1000:
-        return r1.content
     sep = "&" if "?" in shared_url else "?"
     url2 = f"{shared_url}{sep}download=1"
-    r2 = requests.get(url2, allow_redirects=True, timeout=60)
-    if r2.ok and r2.content and len(r2.content) > 1000:
-        return r2.content
+    for url in (url1, url2):
+        try:
+            validator = _remote_validator(url)
+            # sem ETag/Last-Modified não dá p/ saber se mudou -> baixa sempre (nada de cache)
+            return _fetch(url, validator) if validator else _download(url)
+        except RuntimeError:
+            continue
     raise RuntimeError("Não foi possível baixar a planilha. Verifique o compartilhamento do link no OneDrive.")
 
 # ==========================
-# PDF (layout)
+# PDF (lotes em paralelo; layout em romaneio_pdf.py)
 # ==========================
-MARGIN_L = 1.6*cm
-MARGIN_R = 1.6*cm
-COL_LABEL_X = MARGIN_L + 0.9*cm
-COL_VALUE_X = MARGIN_L + 6.3*cm
-STEP_Y     = 0.95*cm
-ROUND_R    = 8
-
-# RESPIROS/ESPACOS
-GAP_AFTER_INFO_TITLE = 0.60*cm    # espaço entre “Informações:” e DATA
-GAP_AFTER_FAST_TITLE = 0.60*cm    # espaço entre título e primeira linha
-SIG_DELTA_DOWN       = 1.50*cm    # assinaturas mais para baixo
-TITLE_SHIFT_LEFT     = 0.50*cm    # título Romaneio Manual 0,5 cm para a esquerda
-
-def format_qtd(val) -> str:
-    try:
-        f = float(val)
-        return str(int(round(f))) if abs(f - round(f)) < 1e-9 else str(f)
-    except Exception:
-        return str(val)
-
-def str_or_default(row, col, default=""):
-    return str(row[col]).strip() if col in row and pd.notna(row[col]) else default
-
-def draw_header(c: canvas.Canvas, data_cabecalho: datetime, page_w, page_h):
-    c.setFillColor(colors.black); c.setStrokeColor(colors.black)
-
-    # Logo
-    if os.path.exists(LOGO_IMAGE_PATH):
-        try:
-            c.drawImage(LOGO_IMAGE_PATH, MARGIN_L, page_h - 2.35*cm,
-                        width=3.9*cm, height=1.25*cm, preserveAspectRatio=True, mask='auto')
-        except Exception:
-            pass
-
-    # Título CENTRAL deslocado 0,5 cm para a ESQUERDA
-    c.setFont("Helvetica-Bold", 22)
-    c.drawCentredString(page_w/2 - TITLE_SHIFT_LEFT, page_h - 2.7*cm, "Romaneio Manual")
-
-    # Caixa meta (direita)
-    box_w, box_h = 5.4*cm, 3.0*cm
-    box_x = page_w - MARGIN_R - box_w
-    box_y = page_h - 2.0*cm - box_h
-    c.setLineWidth(1.5)
-    c.roundRect(box_x, box_y, box_w, box_h, 6, stroke=1, fill=0)
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(box_x + box_w/2, box_y + box_h - 0.9*cm, "Romaneio")
-
-    c.setFont("Helvetica", 10.5)
-    c.drawRightString(box_x + box_w - 0.3*cm, box_y + box_h - 1.70*cm, f"Cód.: {FORM_COD}")
-    c.drawRightString(box_x + box_w - 0.3*cm, box_y + box_h - 2.05*cm, f"Rev.: {FORM_REV}")
-    # Data fixa no quadro
-    c.drawRightString(box_x + box_w - 0.3*cm, box_y + 0.55*cm,               f"Data: {FORM_ISO_DATE}")
-
-def draw_info_section(c, info, page_w, page_h):
-    title_h = 1.1*cm
-    content_h = 6*STEP_Y
-    pad_top, pad_bottom = 0.5*cm, 0.6*cm
-    sec_h = title_h + pad_top + GAP_AFTER_INFO_TITLE + content_h + pad_bottom
-
-    top_y = page_h - 6.1*cm
-    bottom_y = top_y - sec_h
-
-    c.setLineWidth(1.5)
-    c.roundRect(MARGIN_L, bottom_y, page_w - MARGIN_L - MARGIN_R, sec_h, ROUND_R, stroke=1, fill=0)
-
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(MARGIN_L + 0.7*cm, top_y - 0.85*cm, "Informações:")
-
-    y = top_y - title_h - GAP_AFTER_INFO_TITLE
-    c.setFont("Helvetica-Bold", 12)
-    rows = [
-        ("DATA:",           info.get("DATA","")),
-        ("CONTEUDO:",       info.get("CONTEUDO","")),
-        ("CLIENTE:",        info.get("CLIENTE","")),
-        ("TRANSPORTADORA:", info.get("TRANSPORTADORA","")),
-        ("MOTORISTA:",      info.get("MOTORISTA","")),
-        ("PLACA:",          info.get("PLACA","")),
-    ]
-    for rot, val in rows:
-        c.drawString(COL_LABEL_X, y, rot)
-        # valores
-        c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
-        y -= STEP_Y
-
-    return bottom_y - 0.9*cm
-
-def draw_products_section(c, prod_info, start_y, page_w, titulo=PRODUTO_TITULO, show_fields=True):
-    """show_fields=False -> usa apenas 'LISTA' ou apenas um campo customizado (caso LEILÃO)."""
-    title_h = 1.0*cm
-    fields_h = 4*STEP_Y if show_fields else 1*STEP_Y
-    lista_h  = 5.0*cm if show_fields else 0  # p/ LEILÃO não precisamos da área de lista
-    pad_top, pad_bottom = 0.5*cm, 0.6*cm
-    gap_fields_lista = 0.35*cm if show_fields else 0
-
-    sec_h = title_h + pad_top + GAP_AFTER_FAST_TITLE + fields_h + gap_fields_lista + lista_h + pad_bottom
-    bottom_y = start_y - sec_h
-
-    c.setLineWidth(1.5)
-    c.roundRect(MARGIN_L, bottom_y, page_w - MARGIN_L - MARGIN_R, sec_h, ROUND_R, stroke=1, fill=0)
-
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(MARGIN_L + 0.7*cm, start_y - 0.8*cm, titulo)
-
-    y = start_y - title_h - GAP_AFTER_FAST_TITLE
-    c.setFont("Helvetica-Bold", 12)
-
-    if show_fields:
-        fields = [
-            ("CNTR(ORIGEM):", prod_info.get("CNTR_ORIGEM","")),
-            ("CNTR(TECADI):", prod_info.get("CNTR_TECADI","")),
-            ("SKU:",          prod_info.get("SKU","")),
-            ("QTD:",          prod_info.get("QTD","")),
-        ]
-        for rot, val in fields:
-            c.drawString(COL_LABEL_X, y, rot)
-            c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
-            y -= STEP_Y
-
-        y -= gap_fields_lista
-        c.drawString(COL_LABEL_X, y, "LISTA:")
-        y -= 0.3*cm
-        lista_texto = str(prod_info.get("LISTA","")).replace(" ;", ";").replace("  ", " ")
-        style = ParagraphStyle(name="lista", fontName="Helvetica", fontSize=12, leading=14, textColor=colors.black)
-        para = Paragraph(lista_texto, style=style)
-
-        frame_x = COL_LABEL_X
-        frame_y = bottom_y + pad_bottom + 0.2*cm
-        frame_w = page_w - MARGIN_R - frame_x
-        frame_h = lista_h
-        Frame(frame_x, frame_y, frame_w, frame_h, showBoundary=0).addFromList([para], c)
+@st.cache_resource
+def _pdf_pool():
+    """Um pool por processo (não um por clique); None com 1 núcleo -> gera em série.
+    forkserver/spawn, nunca fork: o servidor do Streamlit tem várias threads e um fork
+    no meio delas pode travar o filho. Os workers só importam romaneio_pdf."""
+    workers = os.cpu_count() or 1
+    if workers < 2:
+        return None
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload(["romaneio_pdf"])  # reportlab/pypdf importados 1x no servidor
     else:
-        # LEILÃO: apenas CNTR(TECADI)
-        rot, val = "CNTR(TECADI):", prod_info.get("CNTR_TECADI","")
-        c.drawString(COL_LABEL_X, y, rot)
-        c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
-
-    # Assinaturas
-    sig_y = 2.6*cm - SIG_DELTA_DOWN
-    c.setStrokeColor(colors.black); c.setLineWidth(1)
-    c.line(2*cm, sig_y, 9*cm, sig_y); c.line(11*cm, sig_y, 18*cm, sig_y)
-    c.setFont("Helvetica", 10)
-    c.drawCentredString(5.5*cm, sig_y - 0.45*cm, "ASS: MOTORISTA")
-    c.drawCentredString(14.5*cm, sig_y - 0.45*cm, "ASS: CONFERENTE")
-
-def gerar_pdf_row(row: pd.Series, data_cabecalho: datetime) -> bytes:
-    """FASTFOB/CIF (planilha)"""
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    page_w, page_h = A4
-
-    draw_header(c, data_cabecalho, page_w, page_h)
-
-    info = {
-        "DATA": data_cabecalho.strftime("%d/%m/%Y"),   # variável (verde)
-        "CONTEUDO": CONTEUDO_FIXO,
-        "CLIENTE": CLIENTE_FIXO,
-        "TRANSPORTADORA": str_or_default(row, "TRANSPORTADORA"),
-        "MOTORISTA":      str_or_default(row, "NOME"),
-        "PLACA":          str_or_default(row, "PLACA"),
-    }
-    next_y = draw_info_section(c, info, page_w, page_h)
-
-    prod = {
-        "CNTR_ORIGEM": str_or_default(row, "ARMADOR"),
-        "CNTR_TECADI": str_or_default(row, "TECADI"),
-        "SKU":         str_or_default(row, "SKU"),
-        "QTD":         format_qtd(str_or_default(row, "QTD")),
-        "LISTA":       str_or_default(row, "LISTA"),
-    }
-    draw_products_section(c, prod, next_y, page_w, titulo=PRODUTO_TITULO, show_fields=True)
-
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    return buf.read()
-
-def gerar_pdf_leilao(data_pdf: datetime, cntr_tecadi: str, placas: str, motorista: str) -> bytes:
-    """LEILÃO (formulário)"""
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    page_w, page_h = A4
-
-    draw_header(c, data_pdf, page_w, page_h)
-
-    info = {
-        "DATA": data_pdf.strftime("%d/%m/%Y"),
-        "CONTEUDO": CONTEUDO_FIXO,
-        "CLIENTE": CLIENTE_FIXO,
-        "TRANSPORTADORA": "LEILÃO",
-        "MOTORISTA": motorista.strip(),
-        "PLACA": placas.strip(),
-    }
-    next_y = draw_info_section(c, info, page_w, page_h)
-
-    prod = {"CNTR_TECADI": cntr_tecadi.strip()}
-    draw_products_section(c, prod, next_y, page_w, titulo="LEILÃO", show_fields=False)
-
-    c.showPage()
-    c.save()
-    buf.seek(0)
-    return buf.read()
+        ctx = mp.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+
+def gerar_pdfs(jobs: list):
+    """Os lotes são independentes -> gera em paralelo no pool, mantendo a ordem.
+    É um gerador: quem consome grava cada PDF e o descarta, sem acumular o lote inteiro na memória."""
+    pool = _pdf_pool()
+    workers = os.cpu_count() or 1
+    # em paralelo, reparte entre os núcleos (sem passar de PDF_LOTE páginas por canvas)
+    lote = max(1, min(PDF_LOTE, -(-len(jobs) // workers))) if pool else PDF_LOTE
+    lotes = [jobs[k:k+lote] for k in range(0, len(jobs), lote)]
+    feitos = 0
+    if pool is not None and len(lotes) > 1:
+        try:
+            for pdfs in pool.map(gerar_lote, lotes):
+                yield from pdfs
+                feitos += 1
+        except BrokenProcessPool:
+            # um worker morreu: descarta o pool (o próximo clique cria outro) e termina em série
+            _pdf_pool.clear()
+    for pdfs in map(gerar_lote, lotes[feitos:]):
+        yield from pdfs
 
 # ==========================
 # UI — PRIMEIRA CHAMADA
@@ -309,8 +235,8 @@ st.set_page_config(page_title=APP_TITLE, layout="centered")
 # Fundo do APP + legibilidade
 def set_app_background(image_path: str):
     if not os.path.exists(image_path): return
-    with open(image_path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
+    # URL do static serving (não base64 inline): o navegador baixa 1x e cacheia entre os reruns
+    bg_url = "app/static/" + os.path.basename(image_path)
     st.markdown(f"""
         <style>
         header[data-testid="stHeader"] {{ display:none; }}
@@ -318,7 +244,7 @@ def set_app_background(image_path: str):
         #MainMenu {{ visibility:hidden; }}
         footer {{ visibility:hidden; }}
         .stApp {{
-            background-image: url("data:image/jpg;base64,{b64}");
+            background-image: url("{bg_url}");
             background-size: cover; background-position: center center; background-attachment: fixed;
         }}
         .block-container {{
@@ -421,58 +347,51 @@ if st.session_state.mode == "FASTFOB":
     with col_b:
         bt_gerar = st.button("🧾 Gerar PDFs (FINALIZADOS)", use_container_width=True)
 
-    if "df_cache" not in st.session_state: st.session_state.df_cache = None
+    if "df_fin_cache" not in st.session_state: st.session_state.df_fin_cache = None
     if "fetch_error" not in st.session_state: st.session_state.fetch_error = None
+    if "sheet_error" not in st.session_state: st.session_state.sheet_error = None
 
     if bt_atualizar:
         try:
             xls_bytes = onedrive_direct_download(ONEDRIVE_LINK)
-            st.session_state.df_cache = load_excel_from_bytes(xls_bytes)
+            df = _parse(xls_bytes)
+            if "STATUS" in df.columns:
+                st.session_state.df_fin_cache = finalizados(df)
+                st.session_state.sheet_error = None
+            else:
+                st.session_state.df_fin_cache = None
+                st.session_state.sheet_error = "Falta a coluna obrigatória STATUS na planilha."
             st.session_state.fetch_error = None
         except Exception as e:
-            st.session_state.df_cache = None
+            st.session_state.df_fin_cache = None
+            st.session_state.sheet_error = None
             st.session_state.fetch_error = str(e)
 
     if st.session_state.fetch_error:
         st.error("Falha ao baixar do OneDrive: " + st.session_state.fetch_error)
+    if st.session_state.sheet_error:
+        st.error(st.session_state.sheet_error)
 
-    if st.session_state.df_cache is not None:
-        df = st.session_state.df_cache
-        df_fin = df[df["STATUS"].astype(str).str.upper().eq("FINALIZADO")].copy()
+    if st.session_state.df_fin_cache is not None:
+        df_fin = st.session_state.df_fin_cache
 
         st.markdown(f"### ✅ FAST FOB finalizados: **{len(df_fin)}**")
 
         cols_view = ["DEMANDA","TRANSPORTADORA","NOME","PLACA","LISTA"]
         cols_existing = [c for c in cols_view if c in df_fin.columns]
         if cols_existing:
-            df_view = df_fin[cols_existing].copy()
-            for c in df_view.columns:
-                df_view[c] = df_view[c].astype("string")
-            st.dataframe(df_view.reset_index(drop=True), use_container_width=True, hide_index=True)
+            df_view = df_fin[cols_existing].astype("string")  # astype já devolve um frame novo
+            # resumo só leitura: st.table manda HTML estático, sem o grid JS do st.dataframe
+            # (RangeIndex -> índice já fica oculto nas versões atuais do Streamlit)
+            st.table(df_view.reset_index(drop=True))
         else:
             st.warning("Não encontrei as colunas esperadas para exibição (DEMANDA, TRANSPORTADORA, NOME, PLACA, LISTA).")
 
         # seleção manual
-        def _make_key(row: pd.Series) -> str:
-            demanda_raw = str(row.get("DEMANDA", ""))
-            m = re.search(r"(\d+)", demanda_raw)
-            demanda_num = m.group(1) if m else demanda_raw
-            return f"{demanda_num}|{str(row.get('ARMADOR',''))}"
-
-        df_fin = df_fin.copy()
-        df_fin["_key"] = df_fin.apply(_make_key, axis=1)
-
-        labels = {}
-        for _, r in df_fin.iterrows():
-            label = " — ".join([
-                str(r.get("DEMANDA","")),
-                str(r.get("ARMADOR","")),
-                str(r.get("TRANSPORTADORA","")),
-                str(r.get("NOME","")),
-                str(r.get("PLACA","")),
-                str(r.get("LISTA","")),
-            ])
-            labels[r["_key"]] = label
+        cols_label = ["DEMANDA","ARMADOR","TRANSPORTADORA","NOME","PLACA","LISTA"]
+        labels_series = _col_as_string(df_fin, cols_label[0]).str.cat(
+            [_col_as_string(df_fin, c) for c in cols_label[1:]], sep=" — ")
+        labels = dict(zip(df_fin["_key"], labels_series))
 
         selected_keys = st.multiselect(
             "Selecione as linhas que deseja gerar (opcional)",
@@ -483,19 +402,10 @@ if st.session_state.mode == "FASTFOB":
         st.session_state["selected_keys"] = selected_keys
 
     if st.session_state.mode == "FASTFOB" and 'bt_gerar' in locals() and bt_gerar:
-        df = st.session_state.df_cache
-        if df is None:
+        df_ok = st.session_state.df_fin_cache
+        if df_ok is None:
             st.error("Clique em **Atualizar Finalizados** primeiro.")
         else:
-            df_ok = df[df["STATUS"].astype(str).str.upper().eq("FINALIZADO")].copy()
-
-            def _make_key(row: pd.Series) -> str:
-                demanda_raw = str(row.get("DEMANDA", ""))
-                m = re.search(r"(\d+)", demanda_raw)
-                demanda_num = m.group(1) if m else demanda_raw
-                return f"{demanda_num}|{str(row.get('ARMADOR',''))}"
-
-            df_ok["_key"] = df_ok.apply(_make_key, axis=1)
             selected = st.session_state.get("selected_keys") or []
             if selected:
                 df_ok = df_ok[df_ok["_key"].isin(selected)]
@@ -506,25 +416,26 @@ if st.session_state.mode == "FASTFOB":
             elif df_ok.empty:
                 st.warning("Nenhuma linha com STATUS = FINALIZADO (ou nada selecionado).")
             else:
-                zip_buf = io.BytesIO()
-                with zipfile.ZipFile(zip_buf, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for i, row in df_ok.iterrows():
-                        try:
-                            pdf_bytes = gerar_pdf_row(row, data_pdf)
-                            demanda_raw = str_or_default(row, "DEMANDA")
-                            m = re.search(r"(\d+)", demanda_raw); demanda_num = m.group(1) if m else demanda_raw
-                            armador = str_or_default(row, "ARMADOR")
-                            fname = f"{demanda_num}.{armador}.pdf"
-                            zf.writestr(fname, pdf_bytes)
-                        except Exception as e:
-                            zf.writestr(f"ERRO_{i}.txt", f"Falha na linha {i}: {repr(e)}")
-                zip_buf.seek(0)
-                st.download_button(
-                    "⬇️ Baixar ZIP com PDFs",
-                    data=zip_buf,
-                    file_name=f"romaneios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                    mime="application/zip"
-                )
+                # só as colunas do PDF; itertuples evita montar uma Series por linha
+                rows = df_ok[REQUIRED_FOR_PDF].itertuples(index=False)
+                jobs = [(i, t._asdict(), data_pdf) for i, t in zip(df_ok.index, rows)]
+                # ZIP vai p/ um arquivo temporário (apagado ao fechar), não p/ um BytesIO
+                with tempfile.TemporaryFile(suffix=".zip") as zip_file:
+                    with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_STORED) as zf:  # PDF já é comprimido (FlateDecode)
+                        for fname, payload in gerar_pdfs(jobs):
+                            # data fixa (mesmo lote -> mesmo ZIP); não usa a do cabeçalho: o ZIP só aceita 1980..2107
+                            info = zipfile.ZipInfo(fname, date_time=ZIP_ENTRY_DATE)
+                            info.external_attr = 0o100644 << 16  # arquivo comum, rw-r--r--
+                            zf.writestr(info, payload)
+                    zip_file.flush()
+                    # download_button só aceita BufferedReader (não o BufferedRandom do TemporaryFile)
+                    with open(zip_file.fileno(), "rb", closefd=False) as zip_reader:
+                        st.download_button(
+                            "⬇️ Baixar ZIP com PDFs",
+                            data=zip_reader,
+                            file_name=f"romaneios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                            mime="application/zip"
+                        )
 
 # ==========================
 # MODO LEILÃO (formulário simples)
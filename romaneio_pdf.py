@@ -0,0 +1,305 @@
+"""Geração dos PDFs do romaneio (FASTFOB/CIF e LEILÃO).
+
+Fica fora do rom.py para ser importável pelos processos do pool de PDFs:
+o worker só importa este módulo (reportlab/pypdf), nunca o script do Streamlit.
+"""
+import io, os, re
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Paragraph, Frame
+from reportlab.lib.styles import ParagraphStyle
+from pypdf import PdfReader, PdfWriter
+
+# ==========================
+# CONFIG
+# ==========================
+CLIENTE_FIXO    = "SPRINGER CARRIER LTDA (MIDEA)."
+CONTEUDO_FIXO   = "CHEIO"
+PRODUTO_TITULO  = "FAST CIF/FOB"
+FORM_COD        = "FM 108"
+FORM_REV        = "01"
+FORM_ISO_DATE   = "02/10/2025"  # data fixa do quadro "Romaneio" no PDF
+
+LOGO_IMAGE_PATH = "logo_tecadi.png"   # logo no PDF (fundo do PDF é branco)
+
+RE_DIGITS = re.compile(r"(\d+)")  # nº da DEMANDA ("D-1234" -> "1234")
+
+# ==========================
+# PDF (layout)
+# ==========================
+
+MARGIN_L = 1.6*cm
+MARGIN_R = 1.6*cm
+COL_LABEL_X = MARGIN_L + 0.9*cm
+COL_VALUE_X = MARGIN_L + 6.3*cm
+STEP_Y     = 0.95*cm
+ROUND_R    = 8
+
+# RESPIROS/ESPACOS
+GAP_AFTER_INFO_TITLE = 0.60*cm    # espaço entre “Informações:” e DATA
+GAP_AFTER_FAST_TITLE = 0.60*cm    # espaço entre título e primeira linha
+SIG_DELTA_DOWN       = 1.50*cm    # assinaturas mais para baixo
+TITLE_SHIFT_LEFT     = 0.50*cm    # título Romaneio Manual 0,5 cm para a esquerda
+
+def format_qtd(val) -> str:
+    try:
+        f = float(val)
+        return str(int(round(f))) if abs(f - round(f)) < 1e-9 else str(f)
+    except Exception:
+        return str(val)
+
+def str_or_default(row, col, default=""):
+    return str(row[col]).strip() if col in row and pd.notna(row[col]) else default
+
+@lru_cache(maxsize=1)
+def _logo_image():
+    """Logo decodificado uma vez só (o ImageReader guarda o raster entre os drawImage)."""
+    return ImageReader(LOGO_IMAGE_PATH) if os.path.exists(LOGO_IMAGE_PATH) else None
+
+def draw_header(c: canvas.Canvas, data_cabecalho: datetime, page_w, page_h):
+    c.setFillColor(colors.black); c.setStrokeColor(colors.black)
+
+    # Logo
+    logo = _logo_image()
+    if logo is not None:
+        try:
+            c.drawImage(logo, MARGIN_L, page_h - 2.35*cm,
+                        width=3.9*cm, height=1.25*cm, preserveAspectRatio=True, mask='auto')
+        except Exception:
+            pass
+
+    # Título CENTRAL deslocado 0,5 cm para a ESQUERDA
+    c.setFont("Helvetica-Bold", 22)
+    c.drawCentredString(page_w/2 - TITLE_SHIFT_LEFT, page_h - 2.7*cm, "Romaneio Manual")
+
+    # Caixa meta (direita)
+    box_w, box_h = 5.4*cm, 3.0*cm
+    box_x = page_w - MARGIN_R - box_w
+    box_y = page_h - 2.0*cm - box_h
+    c.setLineWidth(1.5)
+    c.roundRect(box_x, box_y, box_w, box_h, 6, stroke=1, fill=0)
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawCentredString(box_x + box_w/2, box_y + box_h - 0.9*cm, "Romaneio")
+
+    c.setFont("Helvetica", 10.5)
+    c.drawRightString(box_x + box_w - 0.3*cm, box_y + box_h - 1.70*cm, f"Cód.: {FORM_COD}")
+    c.drawRightString(box_x + box_w - 0.3*cm, box_y + box_h - 2.05*cm, f"Rev.: {FORM_REV}")
+    # Data fixa no quadro
+    c.drawRightString(box_x + box_w - 0.3*cm, box_y + 0.55*cm,               f"Data: {FORM_ISO_DATE}")
+
+def draw_info_section(c, info, page_w, page_h, static=True, values=True):
+    """static -> moldura, título e rótulos; values -> só os valores (o template FASTFOB usa separado)."""
+    title_h = 1.1*cm
+    content_h = 6*STEP_Y
+    pad_top, pad_bottom = 0.5*cm, 0.6*cm
+    sec_h = title_h + pad_top + GAP_AFTER_INFO_TITLE + content_h + pad_bottom
+
+    top_y = page_h - 6.1*cm
+    bottom_y = top_y - sec_h
+
+    if static:
+        c.setLineWidth(1.5)
+        c.roundRect(MARGIN_L, bottom_y, page_w - MARGIN_L - MARGIN_R, sec_h, ROUND_R, stroke=1, fill=0)
+
+        c.setFont("Helvetica-Bold", 20)
+        c.drawString(MARGIN_L + 0.7*cm, top_y - 0.85*cm, "Informações:")
+
+    y = top_y - title_h - GAP_AFTER_INFO_TITLE
+    c.setFont("Helvetica-Bold", 12)
+    rows = [
+        ("DATA:",           info.get("DATA","")),
+        ("CONTEUDO:",       info.get("CONTEUDO","")),
+        ("CLIENTE:",        info.get("CLIENTE","")),
+        ("TRANSPORTADORA:", info.get("TRANSPORTADORA","")),
+        ("MOTORISTA:",      info.get("MOTORISTA","")),
+        ("PLACA:",          info.get("PLACA","")),
+    ]
+    for rot, val in rows:
+        if static:
+            c.drawString(COL_LABEL_X, y, rot)
+        # valores
+        if values:
+            c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
+        y -= STEP_Y
+
+    return bottom_y - 0.9*cm
+
+def draw_products_section(c, prod_info, start_y, page_w, titulo=PRODUTO_TITULO, show_fields=True,
+                          static=True, values=True):
+    """show_fields=False -> usa apenas 'LISTA' ou apenas um campo customizado (caso LEILÃO).
+    static/values: idem draw_info_section."""
+    title_h = 1.0*cm
+    fields_h = 4*STEP_Y if show_fields else 1*STEP_Y
+    lista_h  = 5.0*cm if show_fields else 0  # p/ LEILÃO não precisamos da área de lista
+    pad_top, pad_bottom = 0.5*cm, 0.6*cm
+    gap_fields_lista = 0.35*cm if show_fields else 0
+
+    sec_h = title_h + pad_top + GAP_AFTER_FAST_TITLE + fields_h + gap_fields_lista + lista_h + pad_bottom
+    bottom_y = start_y - sec_h
+
+    if static:
+        c.setLineWidth(1.5)
+        c.roundRect(MARGIN_L, bottom_y, page_w - MARGIN_L - MARGIN_R, sec_h, ROUND_R, stroke=1, fill=0)
+
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(MARGIN_L + 0.7*cm, start_y - 0.8*cm, titulo)
+
+    y = start_y - title_h - GAP_AFTER_FAST_TITLE
+    c.setFont("Helvetica-Bold", 12)
+
+    if show_fields:
+        fields = [
+            ("CNTR(ORIGEM):", prod_info.get("CNTR_ORIGEM","")),
+            ("CNTR(TECADI):", prod_info.get("CNTR_TECADI","")),
+            ("SKU:",          prod_info.get("SKU","")),
+            ("QTD:",          prod_info.get("QTD","")),
+        ]
+        for rot, val in fields:
+            if static:
+                c.drawString(COL_LABEL_X, y, rot)
+            if values:
+                c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
+            y -= STEP_Y
+
+        y -= gap_fields_lista
+        if static:
+            c.drawString(COL_LABEL_X, y, "LISTA:")
+        if values:
+            lista_texto = str(prod_info.get("LISTA","")).replace(" ;", ";").replace("  ", " ")
+            style = ParagraphStyle(name="lista", fontName="Helvetica", fontSize=12, leading=14, textColor=colors.black)
+            para = Paragraph(lista_texto, style=style)
+
+            frame_x = COL_LABEL_X
+            frame_y = bottom_y + pad_bottom + 0.2*cm
+            frame_w = page_w - MARGIN_R - frame_x
+            frame_h = lista_h
+            Frame(frame_x, frame_y, frame_w, frame_h, showBoundary=0).addFromList([para], c)
+    else:
+        # LEILÃO: apenas CNTR(TECADI)
+        rot, val = "CNTR(TECADI):", prod_info.get("CNTR_TECADI","")
+        if static:
+            c.drawString(COL_LABEL_X, y, rot)
+        if values:
+            c.setFont("Helvetica", 12); c.drawString(COL_VALUE_X, y, str(val)); c.setFont("Helvetica-Bold", 12)
+
+    if not static:
+        return
+
+    # Assinaturas
+    sig_y = 2.6*cm - SIG_DELTA_DOWN
+    c.setStrokeColor(colors.black); c.setLineWidth(1)
+    c.line(2*cm, sig_y, 9*cm, sig_y); c.line(11*cm, sig_y, 18*cm, sig_y)
+    c.setFont("Helvetica", 10)
+    c.drawCentredString(5.5*cm, sig_y - 0.45*cm, "ASS: MOTORISTA")
+    c.drawCentredString(14.5*cm, sig_y - 0.45*cm, "ASS: CONFERENTE")
+
+FASTFOB_FORM = "tpl_fastfob"
+
+def draw_fastfob_template(c: canvas.Canvas, page_w, page_h):
+    """Parte fixa do PDF FASTFOB (cabeçalho, molduras, rótulos, assinaturas) como form XObject:
+    definida 1x por documento e reaproveitada com doForm em cada página."""
+    if c.hasForm(FASTFOB_FORM):
+        return
+    c.beginForm(FASTFOB_FORM)
+    draw_header(c, None, page_w, page_h)
+    next_y = draw_info_section(c, {}, page_w, page_h, values=False)
+    draw_products_section(c, {}, next_y, page_w, titulo=PRODUTO_TITULO, show_fields=True, values=False)
+    c.endForm()
+
+def draw_pdf_row(c: canvas.Canvas, row: dict, data_cabecalho: datetime):
+    """FASTFOB/CIF (planilha): desenha a página de uma linha — row é um dict simples (picklable p/ os processos do pool)"""
+    page_w, page_h = A4
+
+    draw_fastfob_template(c, page_w, page_h)
+    c.doForm(FASTFOB_FORM)
+    c.setFillColor(colors.black); c.setStrokeColor(colors.black)
+
+    info = {
+        "DATA": data_cabecalho.strftime("%d/%m/%Y"),   # variável (verde)
+        "CONTEUDO": CONTEUDO_FIXO,
+        "CLIENTE": CLIENTE_FIXO,
+        "TRANSPORTADORA": str_or_default(row, "TRANSPORTADORA"),
+        "MOTORISTA":      str_or_default(row, "NOME"),
+        "PLACA":          str_or_default(row, "PLACA"),
+    }
+    next_y = draw_info_section(c, info, page_w, page_h, static=False)
+
+    prod = {
+        "CNTR_ORIGEM": str_or_default(row, "ARMADOR"),
+        "CNTR_TECADI": str_or_default(row, "TECADI"),
+        "SKU":         str_or_default(row, "SKU"),
+        "QTD":         format_qtd(str_or_default(row, "QTD")),
+        "LISTA":       str_or_default(row, "LISTA"),
+    }
+    draw_products_section(c, prod, next_y, page_w, titulo=PRODUTO_TITULO, show_fields=True, static=False)
+
+def nome_pdf_row(row: dict) -> str:
+    demanda_raw = str_or_default(row, "DEMANDA")
+    m = RE_DIGITS.search(demanda_raw); demanda_num = m.group(1) if m else demanda_raw
+    armador = str_or_default(row, "ARMADOR")
+    return f"{demanda_num}.{armador}.pdf"
+
+PDF_LOTE = 50  # linhas por canvas (limita a memória de cada lote)
+
+def gerar_lote(jobs: list) -> list:
+    """Gera um lote num canvas só, uma página por linha (fontes, template e logo entram 1x),
+    e depois separa cada página num PDF próprio com pypdf.
+    -> [(nome no ZIP, conteúdo)] na ordem de jobs. Falha vira ERRO_<i>.txt (i = linha no Excel)."""
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    nomes = []  # por página: nome do PDF, ou (nome, texto) do erro
+    for i, row, data_cabecalho in jobs:
+        try:
+            draw_pdf_row(c, row, data_cabecalho)
+            nomes.append(nome_pdf_row(row))
+        except Exception as e:
+            nomes.append((f"ERRO_{i}.txt", f"Falha na linha {i} da planilha: {repr(e)}"))
+        c.showPage()
+    c.save()
+
+    out = []
+    for nome, page in zip(nomes, PdfReader(buf).pages):
+        if isinstance(nome, tuple):
+            out.append(nome)
+            continue
+        writer = PdfWriter()
+        writer.add_page(page)
+        pdf_buf = io.BytesIO()
+        writer.write(pdf_buf)
+        out.append((nome, pdf_buf.getvalue()))
+    return out
+
+def gerar_pdf_leilao(data_pdf: datetime, cntr_tecadi: str, placas: str, motorista: str) -> bytes:
+    """LEILÃO (formulário)"""
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    page_w, page_h = A4
+
+    draw_header(c, data_pdf, page_w, page_h)
+
+    info = {
+        "DATA": data_pdf.strftime("%d/%m/%Y"),
+        "CONTEUDO": CONTEUDO_FIXO,
+        "CLIENTE": CLIENTE_FIXO,
+        "TRANSPORTADORA": "LEILÃO",
+        "MOTORISTA": motorista.strip(),
+        "PLACA": placas.strip(),
+    }
+    next_y = draw_info_section(c, info, page_w, page_h)
+
+    prod = {"CNTR_TECADI": cntr_tecadi.strip()}
+    draw_products_section(c, prod, next_y, page_w, titulo="LEILÃO", show_fields=False)
+
+    c.showPage()
+    c.save()
+    buf.seek(0)
+    return buf.read()